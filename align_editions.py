@@ -0,0 +1,181 @@
+# align_editions.py
+# Map rows between two parser outputs (e.g. data/smm_clean_v3.csv -> smm_clean.csv)
+# using MinHash signatures and LSH banding instead of comparing every pair.
+import argparse, csv, random, re, zlib
+
+from clause_data import SCHEMAS, load_rows
+
+SHINGLE_SIZE = 3
+BANDS = 16
+ROWS_PER_BAND = 4
+THRESHOLD = 0.5
+SEED = 1
+
+MERSENNE = (1 << 61) - 1
+WORD = re.compile(r"[a-z0-9]+")
+
+
+# --------------------------
+# Shingling and MinHash
+# --------------------------
+def shingles(text, k=SHINGLE_SIZE):
+    """Hashed word k-grams of a text; short texts become a single shingle."""
+    words = WORD.findall((text or "").lower())
+    if not words:
+        return set()
+    if len(words) <= k:
+        return {zlib.crc32(" ".join(words).encode())}
+    return {
+        zlib.crc32(" ".join(words[i : i + k]).encode())
+        for i in range(len(words) - k + 1)
+    }
+
+
+def make_permutations(n, seed=SEED):
+    rng = random.Random(seed)
+    return [(rng.randrange(1, MERSENNE), rng.randrange(0, MERSENNE)) for _ in range(n)]
+
+
+def minhash(shingle_set, perms):
+    return tuple(min((a * h + b) % MERSENNE for h in shingle_set) for a, b in perms)
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+# --------------------------
+# Rows
+# --------------------------
+def row_key(row, n):
+    """Stable key for a row; older outputs have no `id` column."""
+    return row.get("id") or row.get("subclause_ref") or row.get("clause_ref") or f"row{n}"
+
+
+def prepare(path, k):
+    schema, _, rows = load_rows(path)
+    group_field = SCHEMAS[schema]["group_field"]
+    text_fields = SCHEMAS[schema]["text_fields"]
+    prepared = []
+    for n, row in enumerate(rows, start=1):
+        text = " ".join(row.get(f) or "" for f in text_fields)
+        prepared.append(
+            {
+                "key": row_key(row, n),
+                "group": row.get(group_field) or "",
+                "shingles": shingles(text, k),
+            }
+        )
+    return prepared
+
+
+# --------------------------
+# Alignment
+# --------------------------
+def align(left, right, bands=BANDS, rows_per_band=ROWS_PER_BAND, threshold=THRESHOLD):
+    """Return [(left_pos, right_pos, score)] plus unmatched positions on each side.
+
+    Rows sharing at least one LSH bucket become candidates; candidates are scored
+    with the exact Jaccard similarity of their shingle sets and paired greedily,
+    best score first, so each row is used at most once. Same-group pairs are
+    made first, then cross-group pairs among the rows still unmatched; ties
+    prefer the same key.
+    """
+    perms = make_permutations(bands * rows_per_band)
+
+    buckets = {}
+    for pos, item in enumerate(left):
+        if not item["shingles"]:
+            continue
+        sig = minhash(item["shingles"], perms)
+        for band in range(bands):
+            key = (band, sig[band * rows_per_band : (band + 1) * rows_per_band])
+            buckets.setdefault(key, []).append(pos)
+
+    candidates = {}
+    for rpos, item in enumerate(right):
+        if not item["shingles"]:
+            continue
+        sig = minhash(item["shingles"], perms)
+        for band in range(bands):
+            key = (band, sig[band * rows_per_band : (band + 1) * rows_per_band])
+            for lpos in buckets.get(key, ()):
+                if (lpos, rpos) not in candidates:
+                    score = jaccard(left[lpos]["shingles"], item["shingles"])
+                    candidates[(lpos, rpos)] = score
+
+    # pair within the same section/class first; only rows left over after that
+    # may pair across groups, which is where renumbered clauses end up
+    def rank(item):
+        (lpos, rpos), score = item
+        return (-score, left[lpos]["key"] != right[rpos]["key"], lpos, rpos)
+
+    ranked = sorted(
+        ((pair, score) for pair, score in candidates.items() if score >= threshold), key=rank
+    )
+    pairs = []
+    used_left, used_right = set(), set()
+    for same_group in (True, False):
+        for (lpos, rpos), score in ranked:
+            if lpos in used_left or rpos in used_right:
+                continue
+            if (left[lpos]["group"] == right[rpos]["group"]) != same_group:
+                continue
+            pairs.append((lpos, rpos, score))
+            used_left.add(lpos)
+            used_right.add(rpos)
+
+    unmatched_left = [p for p in range(len(left)) if p not in used_left]
+    unmatched_right = [p for p in range(len(right)) if p not in used_right]
+    return pairs, unmatched_left, unmatched_right, len(candidates)
+
+
+def write_mapping(path, left, right, pairs, unmatched_left, unmatched_right):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            ["left_id", "left_group", "right_id", "right_group", "score", "same_id"]
+        )
+        for lpos, rpos, score in sorted(pairs):
+            l, r = left[lpos], right[rpos]
+            writer.writerow(
+                [l["key"], l["group"], r["key"], r["group"], f"{score:.3f}", l["key"] == r["key"]]
+            )
+        for lpos in unmatched_left:
+            writer.writerow([left[lpos]["key"], left[lpos]["group"], "", "", "", ""])
+        for rpos in unmatched_right:
+            writer.writerow(["", "", right[rpos]["key"], right[rpos]["group"], "", ""])
+
+
+# --------------------------
+# Main
+# --------------------------
+def main():
+    ap = argparse.ArgumentParser(description="Align clauses between two parser outputs.")
+    ap.add_argument("left", help="older output, e.g. data/smm_clean_v3.csv")
+    ap.add_argument("right", help="newer output, e.g. smm_clean.csv")
+    ap.add_argument("-o", "--output", default="alignment.csv")
+    ap.add_argument("--shingle-size", type=int, default=SHINGLE_SIZE)
+    ap.add_argument("--bands", type=int, default=BANDS)
+    ap.add_argument("--rows-per-band", type=int, default=ROWS_PER_BAND)
+    ap.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = ap.parse_args()
+
+    left = prepare(args.left, args.shingle_size)
+    right = prepare(args.right, args.shingle_size)
+    pairs, unmatched_left, unmatched_right, n_candidates = align(
+        left, right, args.bands, args.rows_per_band, args.threshold
+    )
+    write_mapping(args.output, left, right, pairs, unmatched_left, unmatched_right)
+
+    renumbered = sum(1 for l, r, _ in pairs if left[l]["key"] != right[r]["key"])
+    print(f"✅ Wrote {len(pairs)} matches into {args.output}")
+    print(f"🔎 Candidate pairs scored: {n_candidates} (of {len(left) * len(right)} possible)")
+    print(f"🔀 Matches with a different ID: {renumbered}")
+    print(f"❌ Unmatched: {len(unmatched_left)} left, {len(unmatched_right)} right")
+
+
+if __name__ == "__main__":
+    main()
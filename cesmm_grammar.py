@@ -0,0 +1,108 @@
+# cesmm_grammar.py
+# Declarative grammar for CESMM3.pdf, run by doc_grammar.py
+import re
+from cesmm_structure import CESMM_STRUCTURE
+
+
+# --------------------------
+# Row emission
+# --------------------------
+def class_title(run):
+    heading = run.state["heading"]
+    return CESMM_STRUCTURE.get(run.group, {}).get(
+        "title", heading.strip() if heading else None
+    )
+
+
+def emit_structure(run):
+    """Scaffold class headers and divisions from cesmm_structure.py."""
+    for class_code, content in CESMM_STRUCTURE.items():
+        title = content["title"]
+        # Emit the class header as a "division_level 0" for clarity
+        run.emit(
+            {"class_title": title, "division_level": 0, "division_text": title},
+            group=class_code,
+            row_id=f"{class_code}_HEADER",
+        )
+        for level, items in content.get("divisions", {}).items():
+            for div in items:
+                run.emit(
+                    {"class_title": title, "division_level": level, "division_text": div},
+                    group=class_code,
+                )
+
+
+def on_rule(run, m):
+    row = run.emit(
+        {
+            "class_title": class_title(run),
+            "rule_type": run.state["rule_type"],
+            "rule_code": m["code"],  # e.g. M1, D3
+            "rule_text": m["text"],
+        }
+    )
+    run.found(row["id"])
+
+
+def first_word_lower(s):
+    return s.lower().split()[0]
+
+
+def summary(run):
+    print(f"📑 Classes scaffolded: {len(CESMM_STRUCTURE)}")
+    print(f"📘 Rules captured: {len(run.found_ids)}")
+    if not run.found_ids:
+        print("⚠️ No rules detected. Check regex or PDF formatting.")
+
+
+# --------------------------
+# Grammar
+# --------------------------
+CESMM_GRAMMAR = {
+    "name": "cesmm",
+    "pdf": "CESMM3.pdf",
+    "output": "cesmm_clean.csv",
+    "group_label": "classes",
+    "group_field": "class_code",
+    "order_field": "order_in_class",
+    "fields": [
+        "id",
+        "class_code",
+        "class_title",
+        "division_level",
+        "division_text",
+        "rule_type",
+        "rule_code",
+        "rule_text",
+        "order_in_class",
+    ],
+    "state": {"group": None, "heading": None, "rule_type": None},
+    "prelude": emit_structure,
+    "rules": [
+        {
+            # class heading resets the rule type
+            "name": "class_heading",
+            "pattern": r"^CLASS\s+(?P<cls>[A-Z])[:\s-]+(?P<title>.+)$",
+            "flags": re.IGNORECASE,
+            "set": {"group": ("cls", str.upper), "heading": "title", "rule_type": None},
+        },
+        {
+            "name": "rules_header",
+            "pattern": r"^(?P<kind>MEASUREMENT RULES|DEFINITION RULES|COVERAGE RULES|ADDITIONAL DESCRIPTION RULES)",
+            "flags": re.IGNORECASE,
+            "set": {"rule_type": ("kind", first_word_lower)},
+        },
+        {
+            "name": "rule_line",
+            "pattern": r"^(?P<code>[MDCA]\d+)\s+(?P<text>.*)$",
+            "requires": ["group"],
+            "emit": on_rule,
+        },
+    ],
+    "ids": [
+        {"when": {"rule_code": True}, "template": "{group}_{rule_code}"},
+        {"when": {"division_text": True}, "template": "{group}_DIV{division_level}_{order}"},
+        {"template": "{group}_{order}"},
+    ],
+    "summary": summary,
+}
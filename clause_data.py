@@ -0,0 +1,302 @@
+# clause_data.py
+# Shared helpers for reading and writing parser outputs (smm_clean.csv / cesmm_clean.csv)
+import csv, gzip, hashlib, io, itertools, json, os, queue, threading
+
+
+# --------------------------
+# Schema detection
+# --------------------------
+# Each output kind is identified by the column that groups its rows.
+SCHEMAS = {
+    "smm": {
+        "group_field": "section_code",
+        "order_field": "order_in_section",
+        "text_fields": ["clause_title", "clause_text", "subsection_title"],
+    },
+    "cesmm": {
+        "group_field": "class_code",
+        "order_field": "order_in_class",
+        "text_fields": ["division_text", "rule_text", "class_title"],
+    },
+}
+
+
+def detect_schema(fieldnames) -> str:
+    """Return "smm" or "cesmm" based on the header of a parser output."""
+    fields = set(fieldnames or [])
+    for name, schema in SCHEMAS.items():
+        if schema["group_field"] in fields:
+            return name
+    raise ValueError(f"Unrecognised clause output header: {sorted(fields)}")
+
+
+# --------------------------
+# Compressed files
+# --------------------------
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+CHUNK_SIZE = 1 << 18
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("zstandard is required for .zst files (pip install zstandard)") from e
+    return zstandard
+
+
+def read_errors():
+    """Exceptions raised when reading a truncated, corrupt or unsupported output."""
+    errors = (OSError, ValueError, EOFError, ImportError, csv.Error)
+    try:
+        import zstandard
+    except ImportError:
+        return errors
+    return errors + (zstandard.ZstdError,)
+
+
+def open_text(path, data=None):
+    """Open a plain, gzip or zstd file for streaming text reads (sniffed by magic bytes).
+
+    When `data` holds bytes already read from `path`, those are decoded instead
+    of reopening the file, so callers can hash and parse the same contents.
+    """
+    raw = io.BytesIO(data) if data is not None else open(path, "rb")
+    magic = raw.read(4)
+    raw.seek(0)
+    if magic.startswith(GZIP_MAGIC):
+        if data is None:
+            raw.close()
+            return gzip.open(path, "rt", encoding="utf-8", newline="")
+        stream = gzip.GzipFile(fileobj=raw, mode="rb")
+    elif magic == ZSTD_MAGIC:
+        stream = _zstandard().ZstdDecompressor().stream_reader(raw, closefd=True)
+    else:
+        stream = raw
+    return io.TextIOWrapper(stream, encoding="utf-8", newline="")
+
+
+def is_jsonl(path):
+    return ".jsonl" in os.path.basename(path)
+
+
+class OutputWriter:
+    """Text file whose bytes are compressed and written by a background thread.
+
+    The compression codec follows the file name (`.gz`, `.zst`, else none).
+    Output goes to `<path>.tmp` and is renamed over `path` on close, so
+    readers polling the file only ever see complete outputs.
+    """
+
+    def __init__(self, path, level=None):
+        self.path = path
+        self.tmp = f"{path}.tmp"
+        self.buffer = []
+        self.buffered = 0
+        self.error = None
+        self.closed = False
+        self.chunks = queue.Queue(maxsize=8)
+        self.thread = threading.Thread(target=self._drain, args=(level,), daemon=True)
+        self.thread.start()
+
+    def _open_sink(self, raw, level):
+        if self.path.endswith(".gz"):
+            return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=level or 6)
+        if self.path.endswith(".zst"):
+            cctx = _zstandard().ZstdCompressor(level=level or 3)
+            return cctx.stream_writer(raw, closefd=False)
+        return None
+
+    def _drain(self, level):
+        # zlib and zstd release the GIL while compressing, so this overlaps
+        # with whatever the main thread does between writes (e.g. a parser
+        # streaming rows in as pages are extracted)
+        finished = False
+        try:
+            with open(self.tmp, "wb") as raw:
+                sink = self._open_sink(raw, level)
+                out = sink or raw
+                while True:
+                    chunk = self.chunks.get()
+                    if chunk is None:
+                        finished = True
+                        break
+                    out.write(chunk)
+                if sink:
+                    sink.close()
+        except BaseException as e:
+            self.error = e
+            # keep consuming up to the end marker so the producer never blocks
+            # on a full queue; once it has been seen nothing more is queued
+            while not finished:
+                finished = self.chunks.get() is None
+
+    def _flush(self):
+        if self.buffer:
+            self.chunks.put("".join(self.buffer).encode("utf-8"))
+            self.buffer, self.buffered = [], 0
+
+    def write(self, text):
+        if self.error:
+            raise self.error
+        self.buffer.append(text)
+        self.buffered += len(text)
+        if self.buffered >= CHUNK_SIZE:
+            self._flush()
+        return len(text)
+
+    def _finish(self):
+        """Queue the end marker (once) and wait for the writer thread."""
+        if not self.closed:
+            self.closed = True
+            self.chunks.put(None)
+        self.thread.join()
+
+    def close(self):
+        if self.error is None and not self.closed:
+            self._flush()
+        self._finish()
+        if self.error:
+            if os.path.exists(self.tmp):
+                os.remove(self.tmp)
+            raise self.error
+        os.replace(self.tmp, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._finish()
+            if os.path.exists(self.tmp):
+                os.remove(self.tmp)
+
+
+def write_rows(path, fieldnames, rows, level=None):
+    """Write rows as CSV or JSON Lines (by file name), optionally gzip/zstd-compressed."""
+    with OutputWriter(path, level) as f:
+        if is_jsonl(path):
+            for row in rows:
+                f.write(json.dumps({k: row.get(k) for k in fieldnames}, ensure_ascii=False))
+                f.write("\n")
+        else:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+# --------------------------
+# Loading
+# --------------------------
+def _reader(f, path):
+    """(fieldnames, row iterator) for an open CSV or JSON Lines stream."""
+    if not is_jsonl(path):
+        reader = csv.DictReader(f)
+        return reader.fieldnames or [], reader
+    rows = (json.loads(line) for line in f if line.strip())
+    first = next(rows, None)
+    if first is None:
+        return [], iter(())
+    return list(first), itertools.chain([first], rows)
+
+
+def load_rows(path, data=None):
+    """Load a parser output, returning (schema_name, fieldnames, rows).
+
+    `data` is passed to open_text() to parse bytes already read from `path`.
+    """
+    with open_text(path, data) as f:
+        fieldnames, rows = _reader(f, path)
+        rows = list(rows)
+    return detect_schema(fieldnames), fieldnames, rows
+
+
+def order_key(row, schema_name):
+    """Sort key for keeping rows in document order within their group."""
+    value = row.get(SCHEMAS[schema_name]["order_field"]) or 0
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+# --------------------------
+# Page provenance index
+# --------------------------
+def pdf_digest(pdf_path):
+    with open(pdf_path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def save_page_index(path, pdf_path, page_groups):
+    """Persist {page_number: {"start": group, "groups": [...]}} built during a full parse."""
+    groups = {}
+    for page, info in sorted(page_groups.items()):
+        for code in info["groups"]:
+            groups.setdefault(code, []).append(page)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "pdf": os.path.abspath(pdf_path),
+                "pdf_sha1": pdf_digest(pdf_path),
+                "pages": {str(p): info for p, info in sorted(page_groups.items())},
+                "groups": groups,
+            },
+            f,
+            indent=1,
+        )
+
+
+def load_page_index(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    data["pages"] = {int(p): info for p, info in data["pages"].items()}
+    return data
+
+
+def merge_rows(existing, rebuilt, group_field, groups):
+    """Replace the rows of `groups` in `existing` with `rebuilt`, keeping group positions."""
+    new_by_group = {}
+    for row in rebuilt:
+        new_by_group.setdefault(row[group_field], []).append(row)
+
+    merged, placed = [], set()
+    for row in existing:
+        code = row.get(group_field)
+        if code not in groups:
+            merged.append(row)
+        elif code not in placed:
+            merged.extend(new_by_group.get(code, []))
+            placed.add(code)
+    for code in groups:
+        if code not in placed:
+            merged.extend(new_by_group.get(code, []))
+    return merged
+
+
+def check_page_index(page_index, pdf_path):
+    """Error message if the index was built from a different PDF, else None."""
+    if os.path.abspath(page_index["pdf"]) != os.path.abspath(pdf_path):
+        return f"page index was built from {page_index['pdf']}, not {pdf_path}"
+    if page_index.get("pdf_sha1") and page_index["pdf_sha1"] != pdf_digest(pdf_path):
+        return f"{pdf_path} has changed since the page index was built"
+    return None
+
+
+def pages_for_groups(page_index, groups):
+    """Sorted page numbers on which any of `groups` is active."""
+    pages = set()
+    for code in groups:
+        pages.update(page_index["groups"].get(code, []))
+    return sorted(pages)
+
+
+def group_for_id(rows, clause_id, group_field):
+    """Find which section/class a row ID belongs to in an existing output."""
+    for row in rows:
+        if row.get("id") == clause_id:
+            return row.get(group_field)
+    return None
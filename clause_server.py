@@ -0,0 +1,274 @@
+# clause_server.py
+# Local HTTP lookup service over smm_clean.csv / cesmm_clean.csv
+import argparse, hashlib, json, os, re, threading, time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from clause_data import SCHEMAS, load_rows, order_key, read_errors
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+POLL_INTERVAL = 1.0
+CACHE_SIZE = 1024
+
+TOKEN = re.compile(r"[a-z0-9]+")
+
+
+# --------------------------
+# In-memory index
+# --------------------------
+class ClauseIndex:
+    """Immutable snapshot of one parser output, indexed for lookups."""
+
+    def __init__(self, path):
+        # hash and parse one read, so the ETag always matches the rows served
+        # even if the file is replaced in between
+        with open(path, "rb") as f:
+            data = f.read()
+        self.etag = hashlib.sha1(data).hexdigest()[:16]
+        self.schema, self.fieldnames, rows = load_rows(path, data)
+        group_field = SCHEMAS[self.schema]["group_field"]
+        text_fields = SCHEMAS[self.schema]["text_fields"]
+
+        self.rows = rows
+        self.by_id = {}
+        self.by_group = {}
+        self.postings = {}
+        for pos, row in enumerate(rows):
+            if row.get("id"):
+                # older outputs repeat some synthetic IDs; keep the first one
+                self.by_id.setdefault(row["id"], pos)
+            self.by_group.setdefault(row.get(group_field) or "", []).append(pos)
+            text = " ".join(row.get(f) or "" for f in ["id"] + text_fields)
+            for token in set(TOKEN.findall(text.lower())):
+                self.postings.setdefault(token, []).append(pos)
+
+        for positions in self.by_group.values():
+            positions.sort(key=lambda p: order_key(rows[p], self.schema))
+
+    def get(self, clause_id):
+        pos = self.by_id.get(clause_id)
+        return None if pos is None else self.rows[pos]
+
+    def group(self, code):
+        return [self.rows[p] for p in self.by_group.get(code, [])]
+
+    def search(self, query, group=None, limit=50):
+        """Rows containing every query token, optionally within one group."""
+        tokens = TOKEN.findall(query.lower())
+        if not tokens:
+            return []
+        lists = sorted((self.postings.get(t, []) for t in tokens), key=len)
+        hits = set(lists[0])
+        for positions in lists[1:]:
+            hits.intersection_update(positions)
+            if not hits:
+                return []
+        if group:
+            hits.intersection_update(self.by_group.get(group, []))
+        return [self.rows[p] for p in sorted(hits)[:limit]]
+
+
+class WatchedDataset:
+    """Holds the current ClauseIndex for a file and swaps it when the file changes."""
+
+    def __init__(self, path):
+        self.path = path
+        self.stamp = None
+        self.index = None
+        self.reload()
+
+    def _file_stamp(self):
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def reload(self):
+        """Rebuild the index if the file changed; returns True when swapped."""
+        try:
+            stamp = self._file_stamp()
+        except FileNotFoundError:
+            return False
+        if stamp == self.stamp:
+            return False
+        try:
+            index = ClauseIndex(self.path)
+        except read_errors() as e:
+            # half-written, truncated or foreign file: keep serving the previous snapshot
+            print(f"⚠️ Could not load {self.path}: {e}")
+            return False
+        # single reference assignment, so readers see either old or new index
+        self.index = index
+        self.stamp = stamp
+        return True
+
+
+# --------------------------
+# Response cache
+# --------------------------
+class LRUCache:
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.data.get(key)
+            if value is not None:
+                self.data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+
+# --------------------------
+# HTTP handler
+# --------------------------
+def make_handler(datasets, cache):
+    class ClauseHandler(BaseHTTPRequestHandler):
+        server_version = "ClauseServer/1.0"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            parts = [unquote(p) for p in url.path.strip("/").split("/") if p]
+
+            if parts == ["health"]:
+                body = {
+                    name: {"path": ds.path, "rows": len(ds.index.rows)}
+                    for name, ds in datasets.items()
+                    if ds.index
+                }
+                return self._send(200, json.dumps(body).encode(), None)
+
+            if not parts or parts[0] not in datasets:
+                return self._error(404, "unknown dataset")
+            index = datasets[parts[0]].index
+            if index is None:
+                return self._error(503, "dataset not loaded yet")
+
+            # ETag ties the response to both the data snapshot and the request
+            etag = '"%s-%s"' % (
+                index.etag,
+                hashlib.sha1(self.path.encode()).hexdigest()[:12],
+            )
+            if etag in self._if_none_match():
+                return self._send(304, b"", etag)
+
+            key = (index.etag, self.path)
+            body = cache.get(key)
+            if body is None:
+                status, payload = self._route(index, parts[1:], parse_qs(url.query))
+                if status != 200:
+                    return self._error(status, payload)
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                cache.put(key, body)
+            self._send(200, body, etag)
+
+        def _route(self, index, parts, query):
+            if len(parts) == 2 and parts[0] == "clauses":
+                row = index.get(parts[1])
+                return (200, row) if row else (404, "no such id")
+            if len(parts) == 2 and parts[0] == "groups":
+                return 200, index.group(parts[1])
+            if parts == ["search"]:
+                q = query.get("q", [""])[0]
+                group = query.get("group", [None])[0]
+                try:
+                    limit = int(query.get("limit", ["50"])[0])
+                except ValueError:
+                    limit = -1
+                if limit < 0:
+                    return 400, "limit must be a non-negative integer"
+                return 200, index.search(q, group, limit)
+            return 404, "unknown route"
+
+        def _if_none_match(self):
+            header = self.headers.get("If-None-Match", "")
+            return {tag.strip() for tag in header.split(",") if tag.strip()}
+
+        def _error(self, status, message):
+            self._send(status, json.dumps({"error": message}).encode(), None)
+
+        def _send(self, status, body, etag):
+            self.send_response(status)
+            if etag:
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", "no-cache")
+            if status != 304:
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if status != 304:
+                self.wfile.write(body)
+
+    return ClauseHandler
+
+
+def watch(datasets, interval):
+    while True:
+        time.sleep(interval)
+        for name, ds in datasets.items():
+            # one bad file must not stop polling the others
+            try:
+                if ds.reload():
+                    print(f"🔄 Reloaded {name} from {ds.path} ({len(ds.index.rows)} rows)")
+            except Exception as e:
+                print(f"⚠️ Reload of {name} failed: {type(e).__name__}: {e}")
+
+
+# --------------------------
+# Main
+# --------------------------
+def main():
+    ap = argparse.ArgumentParser(description="Serve SMM/CESMM clauses over HTTP.")
+    ap.add_argument(
+        "paths",
+        nargs="+",
+        metavar="[NAME=]PATH",
+        help="parser output files to serve, under NAME (default: smm or cesmm)",
+    )
+    ap.add_argument("--host", default=DEFAULT_HOST)
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--poll", type=float, default=POLL_INTERVAL)
+    ap.add_argument("--cache-size", type=int, default=CACHE_SIZE)
+    args = ap.parse_args()
+
+    datasets = {}
+    for spec in args.paths:
+        name, _, path = spec.rpartition("=")
+        ds = WatchedDataset(path)
+        if ds.index is None:
+            ap.error(f"cannot load {path}")
+        name = name or ds.index.schema
+        if name == "health":
+            ap.error(f"{name!r} is reserved; serve {path} under another NAME")
+        if name in datasets:
+            ap.error(
+                f"{path} and {datasets[name].path} are both named {name!r}; "
+                f"serve them as NAME=PATH"
+            )
+        datasets[name] = ds
+        print(f"📑 Loaded {name} from {path} ({len(ds.index.rows)} rows)")
+
+    cache = LRUCache(args.cache_size)
+    threading.Thread(target=watch, args=(datasets, args.poll), daemon=True).start()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(datasets, cache))
+    print(f"✅ Serving on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+# clause_snapshot.py
+# Compact binary snapshot of parser output that readers mmap instead of parsing.
+#
+# Layout (little-endian):
+#   header        MAGIC, version, row/field counts, group/order field numbers,
+#                 then the byte offset of every section below
+#   strings       count u32, then count + 1 heap offsets u32; string k is
+#                 heap[offset[k]:offset[k + 1]]
+#   fields        field_count x string number u32
+#   rows          row_count x field_count x string number u32
+#   id index      count u32, then row numbers u32 sorted by id bytes
+#   group dir     count u32, then (string number, first, count) u32 per group,
+#                 sorted by group code; first/count index the group rows
+#   group rows    row numbers u32 sorted by (group, order within group)
+#   heap          deduplicated UTF-8 strings
+#
+# Pages of one file are shared by every process that maps it, and lookups only
+# decode the strings of the rows they return.
+import argparse, json, mmap, os, struct, sys
+
+from clause_data import SCHEMAS, load_rows, order_key
+
+MAGIC = b"CLSNAP01"
+VERSION = 1
+HEADER = struct.Struct("<8sIIIii7Q")
+U32 = struct.Struct("<I")
+GROUP = struct.Struct("<III")
+
+
+# --------------------------
+# Writing
+# --------------------------
+def write_snapshot(path, schema, fieldnames, rows):
+    """Write rows to `path` atomically, so mapped readers keep the old file intact."""
+    heap = bytearray()
+    string_offsets = [0]
+    interned = {}
+
+    def put(value):
+        data = ("" if value is None else str(value)).encode("utf-8")
+        if data not in interned:
+            interned[data] = len(interned)
+            heap.extend(data)
+            string_offsets.append(len(heap))
+        return interned[data]
+
+    fieldnames = list(fieldnames)
+    group_field = SCHEMAS[schema]["group_field"]
+    order_field = SCHEMAS[schema]["order_field"]
+
+    field_table = b"".join(U32.pack(put(name)) for name in fieldnames)
+    row_table = bytearray()
+    for row in rows:
+        for name in fieldnames:
+            row_table += U32.pack(put(row.get(name)))
+
+    ids = sorted(
+        (str(row["id"]).encode("utf-8"), n) for n, row in enumerate(rows) if row.get("id")
+    )
+    id_index = U32.pack(len(ids)) + b"".join(U32.pack(n) for _, n in ids)
+
+    by_group = {}
+    for n, row in enumerate(rows):
+        by_group.setdefault(str(row.get(group_field) or ""), []).append(n)
+    group_dir = bytearray(U32.pack(len(by_group)))
+    group_rows = bytearray()
+    first = 0
+    for code in sorted(by_group, key=lambda c: c.encode("utf-8")):
+        members = sorted(by_group[code], key=lambda n: (order_key(rows[n], schema), n))
+        group_dir += GROUP.pack(put(code), first, len(members))
+        group_rows += b"".join(U32.pack(n) for n in members)
+        first += len(members)
+
+    string_table = U32.pack(len(interned)) + b"".join(
+        U32.pack(off) for off in string_offsets
+    )
+    sections = (string_table, field_table, row_table, id_index, group_dir, group_rows, heap)
+    offsets = []
+    pos = HEADER.size
+    for section in sections:
+        offsets.append(pos)
+        pos += len(section)
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        len(rows),
+        len(fieldnames),
+        fieldnames.index(group_field),
+        fieldnames.index(order_field) if order_field in fieldnames else -1,
+        *offsets,
+    )
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(header)
+        for section in sections:
+            f.write(section)
+    os.replace(tmp, path)
+
+
+# --------------------------
+# Reading
+# --------------------------
+class Snapshot:
+    """Read-only mmap view of a snapshot file."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic,
+            version,
+            self.row_count,
+            self.field_count,
+            self.group_field_no,
+            self.order_field_no,
+            self.strings_off,
+            self.fields_off,
+            self.rows_off,
+            self.ids_off,
+            self.groups_off,
+            self.group_rows_off,
+            self.heap_off,
+        ) = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a clause snapshot (version {VERSION})")
+        self.fieldnames = [
+            self._str(self._u32(self.fields_off, i)) for i in range(self.field_count)
+        ]
+        self.id_field_no = self.fieldnames.index("id") if "id" in self.fieldnames else None
+        self.id_count = U32.unpack_from(self.mm, self.ids_off)[0]
+        self.group_count = U32.unpack_from(self.mm, self.groups_off)[0]
+
+    def close(self):
+        self.mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.row_count
+
+    # low-level access -------------------------------------------------
+    def _u32(self, base, k):
+        return U32.unpack_from(self.mm, base + U32.size * k)[0]
+
+    def _bytes(self, string_no):
+        pos = self.strings_off + U32.size * (string_no + 1)
+        start, end = struct.unpack_from("<II", self.mm, pos)
+        return self.mm[self.heap_off + start : self.heap_off + end]
+
+    def _str(self, string_no):
+        return self._bytes(string_no).decode("utf-8")
+
+    def _cell(self, n, field_no):
+        """String number stored for row `n`, field `field_no`."""
+        return self._u32(self.rows_off, n * self.field_count + field_no)
+
+    # rows -------------------------------------------------------------
+    def value(self, n, field):
+        return self._str(self._cell(n, self.fieldnames.index(field)))
+
+    def row(self, n):
+        """Decode row `n` into a dict, the only point where strings are built."""
+        return {
+            name: self._str(self._cell(n, i)) for i, name in enumerate(self.fieldnames)
+        }
+
+    # id lookup --------------------------------------------------------
+    def _id_row(self, k):
+        return self._u32(self.ids_off, k + 1)
+
+    def find(self, row_id):
+        """Row number for an id (binary search over the id index), or None."""
+        key = row_id.encode("utf-8")
+        lo, hi = 0, self.id_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._bytes(self._cell(self._id_row(mid), self.id_field_no)) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.id_count:
+            n = self._id_row(lo)
+            if self._bytes(self._cell(n, self.id_field_no)) == key:
+                return n
+        return None
+
+    def get(self, row_id):
+        n = self.find(row_id)
+        return None if n is None else self.row(n)
+
+    # group scans ------------------------------------------------------
+    def _group_entry(self, k):
+        pos = self.groups_off + U32.size + k * GROUP.size
+        string_no, first, count = GROUP.unpack_from(self.mm, pos)
+        return self._bytes(string_no), first, count
+
+    def groups(self):
+        return [self._group_entry(k)[0].decode("utf-8") for k in range(self.group_count)]
+
+    def scan_rows(self, code):
+        """Row numbers of a section/class in document order."""
+        key = code.encode("utf-8")
+        lo, hi = 0, self.group_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._group_entry(mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self.group_count:
+            return
+        name, first, count = self._group_entry(lo)
+        if name != key:
+            return
+        for k in range(first, first + count):
+            yield self._u32(self.group_rows_off, k)
+
+    def scan(self, code):
+        for n in self.scan_rows(code):
+            yield self.row(n)
+
+
+# --------------------------
+# Main
+# --------------------------
+def main():
+    ap = argparse.ArgumentParser(description="Build or query clause snapshots.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="snapshot an existing parser output")
+    build.add_argument("source")
+    build.add_argument("snapshot")
+    get = sub.add_parser("get", help="print one row by id")
+    get.add_argument("snapshot")
+    get.add_argument("id")
+    scan = sub.add_parser("scan", help="print all rows of a section/class")
+    scan.add_argument("snapshot")
+    scan.add_argument("group")
+    args = ap.parse_args()
+
+    if args.command == "build":
+        schema, fieldnames, rows = load_rows(args.source)
+        write_snapshot(args.snapshot, schema, fieldnames, rows)
+        print(f"✅ Wrote {len(rows)} rows into {args.snapshot}")
+        return
+
+    with Snapshot(args.snapshot) as snap:
+        if args.command == "get":
+            row = snap.get(args.id)
+            if row is None:
+                sys.exit(f"❌ {args.id} not found")
+            print(json.dumps(row, ensure_ascii=False, indent=1))
+        else:
+            for row in snap.scan(args.group.upper()):
+                print(json.dumps(row, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
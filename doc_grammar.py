@@ -0,0 +1,472 @@
+# doc_grammar.py
+# Shared runtime for the declarative document grammars (smm_grammar.py, cesmm_grammar.py)
+import re, unicodedata, argparse, os, hashlib, json, multiprocessing, time
+from clause_data import (
+    check_page_index,
+    group_for_id,
+    load_page_index,
+    load_rows,
+    merge_rows,
+    pages_for_groups,
+    save_page_index,
+    write_rows,
+)
+from clause_snapshot import write_snapshot
+
+PROVENANCE_FIELDS = ["page_number", "line_offset"]
+
+
+# --------------------------
+# Helpers
+# --------------------------
+def clean_text(s: str) -> str:
+    if not s:
+        return ""
+    s = unicodedata.normalize("NFKC", s)
+    s = s.replace("\u2013", "-").replace("\u2014", "-")
+    s = s.replace("-\n", "")  # join hyphenated words
+    s = s.replace("\u00A0", " ")  # non-breaking spaces
+    # split() breaks on the same whitespace as \s, so this joins wrapped lines,
+    # collapses runs and strips in one pass without a regex
+    return " ".join(s.split())
+
+
+# --------------------------
+# Compilation
+# --------------------------
+NAMED_GROUP = re.compile(r"\(\?P<(\w+)>")
+INLINE_FLAGS = {re.IGNORECASE: "i", re.MULTILINE: "m", re.DOTALL: "s"}
+_compiled = {}
+
+
+class CompiledGrammar:
+    """All line rules of a grammar fused into one alternation.
+
+    Every rule pattern is wrapped as `(?P<_rN>...)` with its named groups
+    prefixed by `rN_`, so a single match attempt per line tells us which rule
+    fired first. When that rule's guard rejects the line, the remaining rules
+    are tried one by one, which keeps the first-match-wins order of the rule list.
+    """
+
+    def __init__(self, grammar):
+        self.rules = grammar["rules"]
+        self.noise = None
+        if grammar.get("noise"):
+            self.noise = re.compile(grammar["noise"], grammar.get("noise_flags", 0))
+        self.group_names = []
+        self.singles = []
+        alternatives = []
+        for i, rule in enumerate(self.rules):
+            names = NAMED_GROUP.findall(rule["pattern"])
+            source = NAMED_GROUP.sub(lambda m: f"(?P<r{i}_{m.group(1)}>", rule["pattern"])
+            source = source.replace("(?P=", f"(?P=r{i}_")
+            flags = "".join(v for k, v in INLINE_FLAGS.items() if rule.get("flags", 0) & k)
+            if flags:
+                source = f"(?{flags}:{source})"
+            self.group_names.append(names)
+            self.singles.append(re.compile(source))
+            alternatives.append(f"(?P<_r{i}>{source})")
+        self.combined = re.compile("|".join(alternatives))
+
+    def _groups(self, i, m):
+        return {name: m.group(f"r{i}_{name}") for name in self.group_names[i]}
+
+    def matches(self, line):
+        """Yield (rule, groups) candidates for a line in rule order."""
+        m = self.combined.match(line)
+        if not m:
+            return
+        # the wrapper group closes last, so it is always the match's lastgroup
+        first = int(m.lastgroup[2:])
+        yield self.rules[first], self._groups(first, m)
+        for i in range(first + 1, len(self.rules)):
+            m2 = self.singles[i].match(line)
+            if m2:
+                yield self.rules[i], self._groups(i, m2)
+
+
+def fingerprint(grammar) -> str:
+    parts = [grammar.get("noise") or "", str(grammar.get("noise_flags", 0))]
+    for rule in grammar["rules"]:
+        parts += [rule["name"], rule["pattern"], str(rule.get("flags", 0))]
+    return hashlib.sha1("\x00".join(parts).encode()).hexdigest()
+
+
+def compile_grammar(grammar) -> CompiledGrammar:
+    """Compile a grammar once per process; reloaded grammars with new patterns recompile."""
+    key = (grammar["name"], fingerprint(grammar))
+    if key not in _compiled:
+        _compiled[key] = CompiledGrammar(grammar)
+    return _compiled[key]
+
+
+# --------------------------
+# Runtime
+# --------------------------
+class GrammarRun:
+    """State for one pass of a grammar over a sequence of pages.
+
+    `groups` limits emitted rows to those sections/classes (partial rebuilds);
+    state transitions still run for every line so page starts stay correct.
+    """
+
+    def __init__(self, grammar, groups=None):
+        self.grammar = grammar
+        self.compiled = compile_grammar(grammar)
+        self.groups = groups
+        self.state = dict(grammar["state"])
+        self.results = []
+        self.counters = {}
+        self.found_ids = set()
+        self.page_groups = {}
+        self.page = None
+        self.line = None
+        if grammar.get("prelude"):
+            grammar["prelude"](self)
+
+    @property
+    def group(self):
+        return self.state.get("group")
+
+    def wanted(self, group):
+        return not self.groups or group in self.groups
+
+    def found(self, row_id):
+        """Record an ID seen in the PDF, for the missing/extra validation."""
+        if row_id and self.wanted(self.group):
+            self.found_ids.add(row_id)
+
+    def emit(self, fields, group=None, row_id=None):
+        """Append a row for `group` (default: current), numbering it within the group."""
+        group = group or self.group
+        if not self.wanted(group):
+            return None
+        self.counters[group] = self.counters.get(group, 0) + 1
+        order = self.counters[group]
+
+        row = dict.fromkeys(self.grammar["fields"])
+        row.update(fields)
+        row[self.grammar["group_field"]] = group
+        row[self.grammar["order_field"]] = order
+        row["page_number"] = self.page
+        row["line_offset"] = self.line
+        row["id"] = row_id or self._synthetic_id(row, group, order)
+        self.results.append(row)
+        return row
+
+    def _synthetic_id(self, row, group, order):
+        for id_rule in self.grammar.get("ids", []):
+            when = id_rule.get("when", {})
+            if all(
+                (row.get(k) if v is True else row.get(k) == v) for k, v in when.items()
+            ):
+                return id_rule["template"].format(group=group, order=order, **row)
+        return None
+
+    def _note_group(self):
+        if self.group and self.group not in self.page_groups[self.page]["groups"]:
+            self.page_groups[self.page]["groups"].append(self.group)
+
+    def feed_page(self, page_number, text, start_state=None):
+        """Run the grammar over one page of extracted text."""
+        if start_state is not None:
+            self.state = dict(self.grammar["state"], **start_state)
+        self.page = page_number
+        self.line = None
+        self.page_groups[page_number] = {"start": dict(self.state), "groups": []}
+        self._note_group()
+
+        noise = self.compiled.noise
+        for line_offset, line in enumerate((text or "").split("\n")):
+            if not line or (noise and noise.search(line)):
+                continue
+            s = clean_text(line)
+            if not s:
+                continue
+            self.line = line_offset
+            for rule, groups in self.compiled.matches(s):
+                if "requires" in rule and not all(self.state.get(k) for k in rule["requires"]):
+                    continue
+                if "same" in rule and any(
+                    groups[g] != self.state.get(k) for g, k in rule["same"].items()
+                ):
+                    continue
+                for key, spec in rule.get("set", {}).items():
+                    if isinstance(spec, tuple):
+                        self.state[key] = spec[1](groups[spec[0]])
+                    elif spec is None:
+                        self.state[key] = None
+                    else:
+                        self.state[key] = groups[spec]
+                self._note_group()
+                if rule.get("emit") and self.wanted(self.group):
+                    rule["emit"](self, groups)
+                break
+
+
+    def stream(self, pages, page_starts=None):
+        """Feed (page_number, text) pairs, yielding each row once its page is done.
+
+        Emitted rows are never changed afterwards, so they can be written out
+        while later pages are still being extracted.
+        """
+        done = 0
+        for page_number, text in pages:
+            start = page_starts.get(page_number) if page_starts is not None else None
+            self.feed_page(page_number, text, start)
+            yield from self.results[done:]
+            done = len(self.results)
+        yield from self.results[done:]
+
+
+def run_pages(grammar, pages, groups=None, page_starts=None):
+    """Run a grammar over (page_number, text) pairs and return the GrammarRun."""
+    run = GrammarRun(grammar, groups)
+    for _ in run.stream(pages, page_starts):
+        pass
+    return run
+
+
+# --------------------------
+# Extraction
+# --------------------------
+# Per-page budget. pdfplumber cannot interrupt extract_text() once started, so
+# it runs in a worker process that is killed when a page overruns the time
+# limit. pdfium's char count is cheap to read up front, so pages over the char
+# limit skip pdfplumber altogether. Either way the page's text comes from
+# pdfium's text layer instead, which is much faster but lays lines out less
+# carefully.
+PAGE_BUDGET = {"seconds": 2.0, "chars": 20000}
+
+
+def _page_worker(pdf_path, conn):
+    """Worker process: extract_text() for each page number received."""
+    import pdfplumber
+
+    with pdfplumber.open(pdf_path) as pdf:
+        conn.send("ready")
+        while True:
+            n = conn.recv()
+            if n is None:
+                break
+            try:
+                page = pdf.pages[n - 1]
+                conn.send((page.extract_text() or "", None))
+                page.close()
+            except Exception as e:
+                conn.send((None, f"{type(e).__name__}: {e}"))
+
+
+class PageExtractor:
+    """Per-page text of one PDF under a budget, falling back to pdfium's text layer."""
+
+    def __init__(self, pdf_path, budget=PAGE_BUDGET):
+        import pypdfium2
+
+        self.pdf_path = pdf_path
+        self.budget = budget
+        self.doc = pypdfium2.PdfDocument(pdf_path)
+        self.worker = None
+        self.conn = None
+
+    def __len__(self):
+        return len(self.doc)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._stop()
+        self.doc.close()
+
+    def _start(self):
+        # spawn, not fork: the parent may be running an OutputWriter thread
+        ctx = multiprocessing.get_context("spawn")
+        self.conn, child = ctx.Pipe()
+        self.worker = ctx.Process(target=_page_worker, args=(self.pdf_path, child), daemon=True)
+        self.worker.start()
+        child.close()
+        try:
+            self.conn.recv()
+        except EOFError:
+            self._stop()
+            raise RuntimeError(f"page worker could not open {self.pdf_path}") from None
+
+    def _stop(self):
+        if self.worker is not None:
+            self.worker.kill()
+            self.worker.join()
+            self.conn.close()
+            self.worker = self.conn = None
+
+    def _plumber_text(self, n):
+        """(text, None) from the worker, or (None, reason) when over budget or failed."""
+        if self.worker is None:
+            self._start()
+        self.conn.send(n)
+        if not self.conn.poll(self.budget["seconds"]):
+            # the only way to stop extract_text() is to kill its process
+            self._stop()
+            return None, f"extract_text over {self.budget['seconds']} s"
+        return self.conn.recv()
+
+    def extract(self, n):
+        """Return (text, log entry) for 1-based page `n`."""
+        start = time.perf_counter()
+        page = self.doc[n - 1]
+        textpage = page.get_textpage()
+        try:
+            chars = textpage.count_chars()
+            entry = {"page": n, "chars": chars}
+            if chars > self.budget["chars"]:
+                text, reason = None, f"{chars} chars"
+            else:
+                text, reason = self._plumber_text(n)
+            if reason:
+                text = textpage.get_text_range().replace("\r\n", "\n").replace("\r", "\n")
+                entry.update(strategy="pdfium", reason=reason)
+            else:
+                entry["strategy"] = "extract_text"
+        finally:
+            textpage.close()
+            page.close()
+        entry["seconds"] = round(time.perf_counter() - start, 3)
+        return text, entry
+
+
+def extract_pages(pdf_path, page_numbers=None, budget=PAGE_BUDGET, report=None):
+    """Yield (page_number, text) for the given 1-based pages of a PDF.
+
+    Each page's log entry is appended to `report` when a list is given.
+    """
+    with PageExtractor(pdf_path, budget) as extractor:
+        if page_numbers is None:
+            page_numbers = range(1, len(extractor) + 1)
+        for n in page_numbers:
+            text, entry = extractor.extract(n)
+            if report is not None:
+                report.append(entry)
+            yield n, text
+
+
+def summarize_pages(report):
+    """Run-report dict: totals plus every page that fell back, with its reason."""
+    return {
+        "pages": len(report),
+        "seconds": round(sum(e["seconds"] for e in report), 3),
+        "fallbacks": [e for e in report if e["strategy"] != "extract_text"],
+    }
+
+
+# --------------------------
+# Output
+# --------------------------
+def output_fields(grammar):
+    return grammar["fields"] + PROVENANCE_FIELDS
+
+
+def companion_path(output, suffix):
+    """File kept next to an output: (out/smm_v7.csv.gz, ".snap") -> out/smm_v7.snap."""
+    root = output
+    for ext in (".gz", ".zst", ".csv", ".jsonl"):
+        if root.endswith(ext):
+            root = root[: -len(ext)]
+    return f"{root}{suffix}"
+
+
+def write_output(path, grammar, rows):
+    """CSV or JSON Lines by file name; `.gz`/`.zst` are compressed in a background thread.
+
+    `rows` may be a generator, in which case rows are written as it yields them.
+    """
+    write_rows(path, output_fields(grammar), rows)
+
+
+# --------------------------
+# Command line
+# --------------------------
+def run_cli(grammar, argv=None):
+    """Full or partial parse of a PDF with `grammar`, shared by parse_smm.py and parse_cesmm.py."""
+    label = grammar["group_label"]
+    ap = argparse.ArgumentParser(
+        description=f"Parse {grammar['pdf']} into {grammar['output']}."
+    )
+    ap.add_argument("--pdf", default=grammar["pdf"])
+    ap.add_argument("--output", default=grammar["output"])
+    ap.add_argument("--page-index", help="page index path (default: next to --output)")
+    ap.add_argument(f"--{label}", dest="groups", help=f"comma-separated {label} to rebuild, e.g. D,E")
+    ap.add_argument("--id", dest="row_id", help=f"rebuild the {label[:-1]} holding this ID")
+    ap.add_argument("--report", help="JSON run report path (default: next to --output)")
+    ap.add_argument(
+        "--snapshot", help='binary snapshot path (default: next to --output, "" to skip)'
+    )
+    ap.add_argument("--page-seconds", type=float, default=PAGE_BUDGET["seconds"])
+    ap.add_argument("--page-chars", type=int, default=PAGE_BUDGET["chars"])
+    args = ap.parse_args(argv)
+    if args.page_index is None:
+        args.page_index = companion_path(args.output, ".page_index.json")
+    if args.report is None:
+        args.report = companion_path(args.output, ".run_report.json")
+    if args.snapshot is None:
+        args.snapshot = companion_path(args.output, ".snap")
+    budget = {"seconds": args.page_seconds, "chars": args.page_chars}
+    page_log = []
+
+    group_field = grammar["group_field"]
+    groups = None
+    if args.groups:
+        groups = {c.strip().upper() for c in args.groups.split(",") if c.strip()}
+    existing = None
+    if groups or args.row_id:
+        if not os.path.exists(args.output) or not os.path.exists(args.page_index):
+            ap.error(f"partial rebuild needs {args.output} and {args.page_index}; run a full parse first")
+        index = load_page_index(args.page_index)
+        mismatch = check_page_index(index, args.pdf)
+        if mismatch:
+            ap.error(f"{mismatch}; run a full parse first")
+        _, _, existing = load_rows(args.output)
+        if args.row_id:
+            # rebuild the whole group so its order numbers stay consistent
+            code = group_for_id(existing, args.row_id, group_field)
+            groups = (groups or set()) | {code or args.row_id[:1].upper()}
+
+    if groups:
+        page_numbers = pages_for_groups(index, groups)
+        page_starts = {n: index["pages"][n]["start"] for n in page_numbers}
+        pages = extract_pages(args.pdf, page_numbers, budget, page_log)
+        run = run_pages(grammar, pages, groups, page_starts)
+        print(f"📄 Re-read {len(page_numbers)} pages for {label} {sorted(groups)}")
+    else:
+        # a full run streams each page's rows to the output writer, so
+        # compression on its thread overlaps with extracting later pages
+        run = GrammarRun(grammar)
+        pages = extract_pages(args.pdf, None, budget, page_log)
+        write_output(args.output, grammar, run.stream(pages))
+        save_page_index(args.page_index, args.pdf, run.page_groups)
+
+    rows = run.results
+    if existing is not None:
+        # a partial run can only be written once merged into the existing rows
+        rows = merge_rows(existing, run.results, group_field, groups)
+        write_output(args.output, grammar, rows)
+    if args.snapshot:
+        write_snapshot(args.snapshot, grammar["name"], output_fields(grammar), rows)
+
+    report = dict(summarize_pages(page_log), budget=budget)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+
+    if existing is not None:
+        print(f"✅ Rebuilt {len(run.results)} rows, {len(rows)} rows in {args.output}")
+    else:
+        print(f"✅ Parsed {len(rows)} rows into {args.output}")
+    print(f"⏱️ {report['pages']} pages extracted in {report['seconds']} s")
+    if report["fallbacks"]:
+        print(f"🐢 {len(report['fallbacks'])} pages used the pdfium fallback (see {args.report})")
+    grammar["summary"](run)
+    if args.row_id and args.row_id not in {row["id"] for row in run.results}:
+        print(f"⚠️ {args.row_id} was not found in the rebuilt {label[:-1]}")
+    return run
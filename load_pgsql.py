@@ -0,0 +1,336 @@
+# load_pgsql.py
+# Parallel, partitioned load of smm_clean.csv / cesmm_clean.csv.
+#
+# Rows are split by section_code (SMM) or class_code (CESMM); every partition is
+# loaded and indexed as a standalone staging table on its own pooled connection,
+# then a single transaction attaches them all and swaps them in for the live table.
+import argparse, csv, io, re, sqlite3, time
+from concurrent.futures import ThreadPoolExecutor
+
+from clause_data import SCHEMAS, load_rows
+
+WORKERS = 4
+CODE = re.compile(r"^[A-Z]$")
+
+COLUMNS = {
+    "smm": [
+        ("id", "VARCHAR(50)"),
+        ("section_code", "CHAR(1) NOT NULL"),
+        ("section_ref", "TEXT NOT NULL"),
+        ("subsection_title", "TEXT"),
+        ("clause_ref", "VARCHAR(50)"),
+        ("subclause_ref", "VARCHAR(50)"),
+        ("clause_title", "TEXT"),
+        ("clause_text", "TEXT"),
+        ("clause_type", "VARCHAR(20) NOT NULL"),
+        ("order_in_section", "INT NOT NULL"),
+        ("page_number", "INT"),
+        ("line_offset", "INT"),
+    ],
+    "cesmm": [
+        ("id", "VARCHAR(50)"),
+        ("class_code", "CHAR(1) NOT NULL"),
+        ("class_title", "TEXT"),
+        ("division_level", "INT"),
+        ("division_text", "TEXT"),
+        ("rule_type", "VARCHAR(20)"),
+        ("rule_code", "VARCHAR(10)"),
+        ("rule_text", "TEXT"),
+        ("order_in_class", "INT NOT NULL"),
+        ("page_number", "INT"),
+        ("line_offset", "INT"),
+    ],
+}
+TABLES = {"smm": "smm_clauses", "cesmm": "cesmm_clauses"}
+SEARCH_FIELD = {"smm": "clause_text", "cesmm": "rule_text"}
+
+
+# --------------------------
+# Partitioning
+# --------------------------
+def partition_rows(rows, key):
+    """Split rows by their normalised section/class code.
+
+    Returns (parts, skipped). The code is written back into a copy of each row,
+    so it satisfies the partition bound; rows without a single-letter code would
+    break the NOT NULL code column and are skipped instead.
+    """
+    parts, skipped = {}, []
+    for row in rows:
+        code = (row.get(key) or "").strip().upper()
+        if not CODE.match(code):
+            skipped.append(row)
+            continue
+        parts.setdefault(code, []).append({**row, key: code})
+    return parts, skipped
+
+
+def partition_name(table, code):
+    return f"{table}_{code.lower()}"
+
+
+# --------------------------
+# Backends
+# --------------------------
+class PostgresBackend:
+    """List-partitioned parent table, built under a staging name and swapped in at the end.
+
+    The live table keeps serving readers until the final transaction, which
+    attaches the staged children, drops the old table and renames the new one.
+    """
+
+    def __init__(self, dsn, schema, columns, workers):
+        from psycopg2.pool import ThreadedConnectionPool
+
+        self.schema = schema
+        self.table = TABLES[schema]
+        self.staging = f"{self.table}_new"
+        self.key = SCHEMAS[schema]["group_field"]
+        self.columns = columns
+        self.pool = ThreadedConnectionPool(1, workers, dsn)
+
+    def _run(self, statements):
+        conn = self.pool.getconn()
+        try:
+            with conn, conn.cursor() as cur:
+                for sql in statements:
+                    cur.execute(sql)
+        finally:
+            self.pool.putconn(conn)
+
+    def create_parent(self):
+        cols = ",\n    ".join(f"{name} {sql_type}" for name, sql_type in COLUMNS[self.schema])
+        self._run(
+            [
+                # leftovers of a failed load; the live table is untouched
+                f"DROP TABLE IF EXISTS {self.staging} CASCADE",
+                f"DROP SEQUENCE IF EXISTS {self.staging}_uid_seq",
+                f"CREATE SEQUENCE {self.staging}_uid_seq",
+                f"CREATE TABLE {self.staging} (\n"
+                f"    uid BIGINT NOT NULL DEFAULT nextval('{self.staging}_uid_seq'),\n"
+                f"    {cols}\n) PARTITION BY LIST ({self.key})",
+            ]
+        )
+
+    def _index_names(self, table):
+        return [f"{table}_id_idx", f"{table}_text_idx"]
+
+    def _index_sql(self, table):
+        # parsed output can repeat an ID, so these are not UNIQUE
+        id_idx, text_idx = self._index_names(table)
+        return [
+            f"CREATE INDEX {id_idx} ON {table} ({self.key}, id)",
+            f"CREATE INDEX {text_idx} ON {table} "
+            f"USING GIN (to_tsvector('english', {SEARCH_FIELD[self.schema]}))",
+        ]
+
+    def load_partition(self, code, rows):
+        child = partition_name(self.staging, code)
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for row in rows:
+            writer.writerow([row.get(c) for c in self.columns])
+        buf.seek(0)
+
+        conn = self.pool.getconn()
+        try:
+            with conn, conn.cursor() as cur:
+                cur.execute(f"DROP TABLE IF EXISTS {child}")
+                cur.execute(f"CREATE TABLE {child} (LIKE {self.staging} INCLUDING DEFAULTS)")
+                # matching CHECK lets ATTACH PARTITION skip its validation scan
+                cur.execute(
+                    f"ALTER TABLE {child} ADD CONSTRAINT {child}_bound "
+                    f"CHECK ({self.key} IS NOT NULL AND {self.key} = '{code}')"
+                )
+                cur.copy_expert(
+                    f"COPY {child} ({', '.join(self.columns)}) FROM STDIN WITH (FORMAT csv)",
+                    buf,
+                )
+                for sql in self._index_sql(child):
+                    cur.execute(sql)
+        finally:
+            self.pool.putconn(conn)
+
+    def _rename(self, old, new):
+        statements = [f"ALTER TABLE {old} RENAME TO {new}"]
+        for old_idx, new_idx in zip(self._index_names(old), self._index_names(new)):
+            statements.append(f"ALTER INDEX {old_idx} RENAME TO {new_idx}")
+        return statements
+
+    def attach(self, codes):
+        statements = []
+        for code in codes:
+            child = partition_name(self.staging, code)
+            statements.append(
+                f"ALTER TABLE {self.staging} ATTACH PARTITION {child} FOR VALUES IN ('{code}')"
+            )
+        # parent indexes adopt the identical per-partition indexes instead of rebuilding
+        statements += self._index_sql(self.staging)
+        for code in codes:
+            child = partition_name(self.staging, code)
+            statements.append(f"ALTER TABLE {child} DROP CONSTRAINT {child}_bound")
+
+        # swap: readers keep the old table until this transaction commits
+        statements += [
+            f"DROP TABLE IF EXISTS {self.table} CASCADE",
+            f"DROP SEQUENCE IF EXISTS {self.table}_uid_seq",
+        ]
+        statements += [
+            f"DROP TABLE IF EXISTS {partition_name(self.table, code)}" for code in codes
+        ]
+        statements += self._rename(self.staging, self.table)
+        for code in codes:
+            statements += self._rename(
+                partition_name(self.staging, code), partition_name(self.table, code)
+            )
+        statements.append(f"ALTER SEQUENCE {self.staging}_uid_seq RENAME TO {self.table}_uid_seq")
+        self._run(statements)
+
+    def close(self):
+        self.pool.closeall()
+
+
+class SQLiteBackend:
+    """Stand-in for exercising the partitioning locally.
+
+    One staging table per partition, each loaded on its own connection. A
+    single transaction at the end replaces the previous tables with them and
+    recreates the UNION ALL view over them.
+    """
+
+    def __init__(self, path, schema, columns, workers):
+        self.path = path
+        self.schema = schema
+        self.table = TABLES[schema]
+        self.staging = f"{self.table}_new"
+        self.key = SCHEMAS[schema]["group_field"]
+        self.columns = columns
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=60)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _run(self, statements):
+        conn = self._connect()
+        try:
+            with conn:
+                for sql in statements:
+                    conn.execute(sql)
+        finally:
+            conn.close()
+
+    def _tables(self, prefix):
+        """Existing partition tables named `<prefix>_<code>`."""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            names = [r[0] for r in rows]
+        finally:
+            conn.close()
+        pattern = re.compile(rf"^{re.escape(prefix)}_[a-z]$")
+        return [name for name in names if pattern.match(name)]
+
+    def create_parent(self):
+        # leftovers of a failed load; the live view and tables are untouched
+        self._run([f"DROP TABLE IF EXISTS {name}" for name in self._tables(self.staging)])
+
+    def load_partition(self, code, rows):
+        child = partition_name(self.staging, code)
+        cols = ", ".join(
+            f"{name} {'INTEGER' if 'INT' in sql_type else 'TEXT'}"
+            for name, sql_type in COLUMNS[self.schema]
+        )
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(f"DROP TABLE IF EXISTS {child}")
+                conn.execute(f"CREATE TABLE {child} (uid INTEGER PRIMARY KEY, {cols})")
+                conn.executemany(
+                    f"INSERT INTO {child} ({', '.join(self.columns)}) "
+                    f"VALUES ({', '.join('?' for _ in self.columns)})",
+                    (
+                        [None if row.get(c) == "" else row.get(c) for c in self.columns]
+                        for row in rows
+                    ),
+                )
+                conn.execute(f"CREATE INDEX {child}_id_idx ON {child} ({self.key}, id)")
+        finally:
+            conn.close()
+
+    def attach(self, codes):
+        statements = [f"DROP VIEW IF EXISTS {self.table}"]
+        statements += [f"DROP TABLE {name}" for name in self._tables(self.table)]
+        for code in codes:
+            child = partition_name(self.table, code)
+            staged = partition_name(self.staging, code)
+            # SQLite cannot rename an index, so the staged one is rebuilt under the live name
+            statements += [
+                f"DROP INDEX {staged}_id_idx",
+                f"ALTER TABLE {staged} RENAME TO {child}",
+                f"CREATE INDEX {child}_id_idx ON {child} ({self.key}, id)",
+            ]
+        if codes:
+            selects = " UNION ALL ".join(
+                f"SELECT * FROM {partition_name(self.table, code)}" for code in codes
+            )
+        else:
+            # nothing was loadable: an empty view with the usual columns
+            names = ["uid"] + [name for name, _ in COLUMNS[self.schema]]
+            selects = f"SELECT {', '.join(f'NULL AS {n}' for n in names)} WHERE 0"
+        statements.append(f"CREATE VIEW {self.table} AS {selects}")
+        self._run(statements)
+
+    def close(self):
+        pass
+
+
+# --------------------------
+# Load
+# --------------------------
+def load(backend, rows, workers=WORKERS):
+    """Load every partition in parallel, then attach them all in one step.
+
+    Returns (parts, skipped) as given by partition_rows().
+    """
+    parts, skipped = partition_rows(rows, backend.key)
+    backend.create_parent()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # list() re-raises the first failed partition here
+        list(pool.map(lambda item: backend.load_partition(*item), parts.items()))
+    backend.attach(sorted(parts))
+    return parts, skipped
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Partitioned parallel load of a parser output.")
+    ap.add_argument("path", help="smm_clean.csv or cesmm_clean.csv")
+    target = ap.add_mutually_exclusive_group(required=True)
+    target.add_argument("--dsn", help='PostgreSQL DSN, e.g. "dbname=smm host=localhost"')
+    target.add_argument("--sqlite", help="SQLite file to use as a local stand-in")
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    args = ap.parse_args()
+
+    schema, fieldnames, rows = load_rows(args.path)
+    known = [name for name, _ in COLUMNS[schema]]
+    columns = [c for c in fieldnames if c in known]
+
+    if args.dsn:
+        backend = PostgresBackend(args.dsn, schema, columns, args.workers)
+    else:
+        backend = SQLiteBackend(args.sqlite, schema, columns, args.workers)
+
+    start = time.perf_counter()
+    try:
+        parts, skipped = load(backend, rows, args.workers)
+    finally:
+        backend.close()
+
+    print(f"✅ Loaded {len(rows) - len(skipped)} rows into {backend.table} in {time.perf_counter() - start:.2f} s")
+    print(f"🧩 Partitions: {len(parts)} ({', '.join(sorted(parts))})")
+    if skipped:
+        print(f"⚠️ Skipped {len(skipped)} rows without a single-letter {backend.key}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# smm_grammar.py
+# Declarative grammar for SMM.pdf, run by doc_grammar.py
+import re
+from doc_grammar import clean_text
+from smm_structure import SMM_STRUCTURE
+
+
+# --------------------------
+# Helpers
+# --------------------------
+def split_title_and_body(body: str):
+    m = re.search(
+        r"\b(shall|are|is|were|will|should|must|means?|includes?|consists?|comprises?|apply|covers?)\b",
+        body,
+        flags=re.IGNORECASE,
+    )
+    if m:
+        return body[: m.start()].strip(" :-—–.,;"), body[m.start() :].strip()
+    return None, body
+
+
+SUBCLAUSE_SPLIT = re.compile(r"(?<!\w)\(([a-z])\)\s+")
+
+
+# --------------------------
+# Row emission
+# --------------------------
+def emit_row(run, ref, title, text, clause_type, subsection_title=None):
+    """Emit a CSV row with structure info; synthetic IDs come from the grammar's `ids`."""
+    section_items = SMM_STRUCTURE.get(run.group, ["Unknown"])
+    return run.emit(
+        {
+            "section_ref": section_items[0] if section_items else "Unknown",
+            "subsection_title": subsection_title,
+            "clause_ref": (
+                ref if ref and "(" not in ref else (ref.split("(")[0] if ref else None)
+            ),
+            "subclause_ref": ref if ref and "(" in ref else None,
+            "clause_title": title,
+            "clause_text": text.strip() if text else "",
+            "clause_type": clause_type,
+        },
+        row_id=ref,
+    )
+
+
+def on_section(run, m):
+    section_items = SMM_STRUCTURE.get(run.group, [])
+    emit_row(
+        run, None, None, section_items[0] if section_items else "", "section_header"
+    )
+    for sub in section_items[1:]:
+        emit_row(run, None, None, sub, "subsection", subsection_title=sub)
+
+
+def on_top_clause(run, m):
+    clause_ref = f"{m['sec']}{m['num']}"
+    cur_sub = run.state["sub"]
+    run.found(clause_ref)
+    title_guess, body_after = split_title_and_body(clean_text(m["body"]))
+
+    if not body_after:
+        emit_row(run, clause_ref, title_guess, "", "clause", cur_sub)
+        return
+    parts = SUBCLAUSE_SPLIT.split(body_after)
+    emit_row(run, clause_ref, title_guess, parts[0], "clause", cur_sub)
+    for i in range(1, len(parts), 2):
+        text = parts[i + 1].strip() if i + 1 < len(parts) else ""
+        subref = f"{clause_ref}({parts[i]})"
+        run.found(subref)
+        emit_row(run, subref, title_guess, text, "subclause", cur_sub)
+
+
+def on_inline_clause(run, m):
+    clause_ref = f"{m['sec']}{m['num']}"
+    run.found(clause_ref)
+    title_guess = (m["title"] or "").strip(" :-—–.,;") or None
+    emit_row(
+        run, clause_ref, title_guess, clean_text(m["body"]), "clause", run.state["sub"]
+    )
+
+
+def summary(run):
+    csv_ids = {row["id"] for row in run.results if row["id"]}
+    missing = sorted(run.found_ids - csv_ids)
+    extra = sorted(csv_ids - run.found_ids)
+    print(f"📑 Unique clauses detected in PDF: {len(run.found_ids)}")
+    print(f"📝 Unique clauses written to CSV: {len(csv_ids)}")
+    print(f"❌ Missing in CSV: {missing if missing else 'None'}")
+    print(f"⚠️ Extra in CSV: {extra[:20]} (showing first 20)")
+
+
+# --------------------------
+# Grammar
+# --------------------------
+SMM_GRAMMAR = {
+    "name": "smm",
+    "pdf": "SMM.pdf",
+    "output": "smm_clean.csv",
+    "group_label": "sections",
+    "group_field": "section_code",
+    "order_field": "order_in_section",
+    "fields": [
+        "id",
+        "section_code",
+        "section_ref",
+        "subsection_title",
+        "clause_ref",
+        "subclause_ref",
+        "clause_title",
+        "clause_text",
+        "clause_type",
+        "order_in_section",
+    ],
+    "state": {"group": None, "sub": None},
+    "noise": r"^(Downloaded by |lOMoARcPSD|Studocu\b)",
+    "noise_flags": re.IGNORECASE,
+    "rules": [
+        {
+            "name": "section",
+            "pattern": r"^SECTION\s+(?P<sec>[A-Z])\b",
+            "flags": re.IGNORECASE,
+            "set": {"group": ("sec", str.upper), "sub": None},
+            "emit": on_section,
+        },
+        {
+            # clause at start of line
+            "name": "top_clause",
+            "pattern": r"^(?P<sec>[A-Z])(?P<num>\d{1,3})\s+(?P<body>.+)$",
+            "same": {"sec": "group"},
+            "emit": on_top_clause,
+        },
+        {
+            # clause inline, after a title
+            "name": "inline_clause",
+            "pattern": r"^(?P<title>.*?)\b(?P<sec>[A-Z])(?P<num>\d{1,3})\b\s+(?P<body>.+)$",
+            "same": {"sec": "group"},
+            "emit": on_inline_clause,
+        },
+    ],
+    "ids": [
+        {"when": {"clause_type": "section_header"}, "template": "{group}_HEADER"},
+        {"when": {"clause_type": "subsection"}, "template": "{group}_SUB_{order}"},
+    ],
+    "summary": summary,
+}
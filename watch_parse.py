@@ -0,0 +1,93 @@
+# watch_parse.py
+# Keep a PDF's extracted text in memory and re-run the grammar whenever the
+# structure or grammar modules change, printing the validation diff.
+import argparse, importlib, os, sys, time
+
+import doc_grammar
+
+POLL_INTERVAL = 0.2
+
+
+def grammar_modules(name):
+    """Modules to reload, in dependency order: runtime, structure, grammar."""
+    return [
+        doc_grammar,
+        importlib.import_module(f"{name}_structure"),
+        importlib.import_module(f"{name}_grammar"),
+    ]
+
+
+def mtimes(paths):
+    stamps = {}
+    for path in paths:
+        try:
+            stamps[path] = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            stamps[path] = None
+    return stamps
+
+
+def reparse(name, texts):
+    """Reload the grammar modules and run them over cached page text."""
+    modules = grammar_modules(name)
+    for module in modules:
+        importlib.reload(module)
+    grammar = getattr(modules[-1], f"{name.upper()}_GRAMMAR")
+    return grammar, modules[0].run_pages(grammar, texts)
+
+
+def report(grammar, run, previous, elapsed):
+    ids = {row["id"] for row in run.results if row["id"]}
+    print(f"\n🔁 {len(run.results)} rows in {elapsed * 1000:.0f} ms")
+    grammar["summary"](run)
+    if previous is not None:
+        added, removed = sorted(ids - previous), sorted(previous - ids)
+        print(f"➕ New IDs since last run: {added[:20] if added else 'None'}")
+        print(f"➖ Gone since last run: {removed[:20] if removed else 'None'}")
+    return ids
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Re-parse on every grammar/structure change.")
+    ap.add_argument("grammar", choices=["smm", "cesmm"])
+    ap.add_argument("--pdf", help="defaults to the grammar's PDF")
+    ap.add_argument("--output", help="also write the output (CSV/JSONL, .gz/.zst) after every run")
+    ap.add_argument("--poll", type=float, default=POLL_INTERVAL)
+    args = ap.parse_args()
+
+    grammar = getattr(grammar_modules(args.grammar)[-1], f"{args.grammar.upper()}_GRAMMAR")
+    pdf_path = args.pdf or grammar["pdf"]
+    watched = [m.__file__ for m in grammar_modules(args.grammar)]
+
+    start = time.perf_counter()
+    page_log = []
+    texts = list(doc_grammar.extract_pages(pdf_path, report=page_log))
+    elapsed = time.perf_counter() - start
+    print(f"📄 Extracted {len(texts)} pages from {pdf_path} in {elapsed:.1f} s")
+    for entry in doc_grammar.summarize_pages(page_log)["fallbacks"]:
+        print(f"🐢 Page {entry['page']} used {entry['strategy']}: {entry['reason']}")
+    print(f"👀 Watching {', '.join(os.path.basename(p) for p in watched)}")
+
+    stamps, previous = None, None
+    while True:
+        current = mtimes(watched)
+        if current != stamps:
+            stamps = current
+            start = time.perf_counter()
+            try:
+                grammar, run = reparse(args.grammar, texts)
+            except Exception as e:
+                # a half-saved module should not kill the warm process
+                print(f"\n⚠️ Reload failed: {type(e).__name__}: {e}", file=sys.stderr)
+            else:
+                previous = report(grammar, run, previous, time.perf_counter() - start)
+                if args.output:
+                    doc_grammar.write_output(args.output, grammar, run.results)
+        try:
+            time.sleep(args.poll)
+        except KeyboardInterrupt:
+            break
+
+
+if __name__ == "__main__":
+    main()